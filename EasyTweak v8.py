@@ -1,12 +1,316 @@
 import json
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import os
 import re
 import base64
+import argparse
+import logging
+import multiprocessing
+import time
+import csv
+import tempfile
+import gzip
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, unquote
+import bisect
+from array import array
+import sys
+import queue
+import threading
+from collections import OrderedDict, ChainMap, deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Only needed for columnar (Parquet) dumps
+    pyarrow = None
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for the matchup simulator
+    np = None
+
+
+# Tokens of a Lua table constructor: comments, strings, punctuation and bare words
+LUA_TOKEN = re.compile(r'--\[\[.*?\]\]|--[^\n]*|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[{}\[\]=,;]|[^\s{}\[\]=,;"\']+', re.DOTALL)
+
+
+def extract_balanced_block(content, start_index):
+    """Extract a balanced Lua block starting from the given index"""
+    level = 1
+    current_index = start_index + 1
+    while current_index < len(content) and level > 0:
+        if content[current_index] == '{':
+            level += 1
+        elif content[current_index] == '}':
+            level -= 1
+        current_index += 1
+    return content[start_index:current_index].strip()
+
+
+def convert_lua_value(value):
+    """Convert a Lua scalar (number, boolean or string) to the matching Python value"""
+    try:
+        if value.lower() == 'true':
+            return True
+        elif value.lower() == 'false':
+            return False
+        elif '.' in value:
+            return float(value)
+        else:
+            return int(value)
+    except ValueError:
+        # Remove one matching pair of enclosing quotes only
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+            return value[1:-1]
+        return value
+
+
+def parse_lua_table(block):
+    """Parse a Lua table constructor into dicts and lists (sequence tables become lists)"""
+    tokens = [t for t in LUA_TOKEN.findall(block) if not t.startswith("--")]
+    position = 0
+    
+    def parse_value():
+        nonlocal position
+        if tokens[position] == "{":
+            return parse_table()
+        # Scalar: take everything up to the next separator at this level
+        start = position
+        while position < len(tokens) and tokens[position] not in (",", ";", "}"):
+            position += 1
+        return convert_lua_value(" ".join(tokens[start:position]))
+    
+    def parse_table():
+        nonlocal position
+        position += 1  # Skip '{'
+        table = {}
+        next_index = 1
+        while position < len(tokens) and tokens[position] != "}":
+            if tokens[position] in (",", ";"):
+                position += 1
+                continue
+            if tokens[position] == "[":
+                # [key] = value
+                key = convert_lua_value(tokens[position + 1].strip("\"'"))
+                position += 4
+            elif position + 1 < len(tokens) and tokens[position + 1] == "=":
+                key = tokens[position]
+                position += 2
+            else:
+                key = next_index
+                next_index += 1
+            table[key] = parse_value()
+        position += 1  # Skip '}'
+        
+        if table and list(table) == list(range(1, len(table) + 1)):
+            return list(table.values())
+        return {str(key): value for key, value in table.items()}
+    
+    return parse_table()
+
+
+def parse_unit_file(file_path, complex_params):
+    """Parse a Lua unit file to extract parameters with proper handling of complex structures
+    
+    Module level (and free of app state) so process pools can run it; raises on errors.
+    """
+    parameters = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+        
+        # Create a working copy to remove complex blocks
+        working_content = content
+        complex_blocks = {}
+        
+        # First, extract complex parameters
+        for complex_param in complex_params:
+            pattern = rf'{complex_param}\s*=\s*{{'
+            match = re.search(pattern, working_content, re.DOTALL | re.IGNORECASE)
+            if match:
+                start_index = match.end() - 1  # Position of the opening brace
+                complex_block = extract_balanced_block(working_content, start_index)
+                complex_blocks[complex_param] = complex_block
+                # Remove the complex block from the working content
+                working_content = working_content.replace(complex_block, "", 1)
+        
+        # Now extract top-level parameters from the modified content
+        pattern = r'^\s*(\w+)\s*=\s*([^,\n{]+),?$'
+        matches = re.findall(pattern, working_content, re.MULTILINE)
+        
+        for param, value in matches:
+            # Skip parameters that are part of complex blocks
+            if param in complex_params:
+                continue
+                
+            # Remove trailing comma if present
+            value = value.strip().rstrip(',')
+            
+            # Skip if value contains '{' (likely a complex structure)
+            if '{' in value:
+                continue
+            
+            # Convert to appropriate type
+            parameters[param] = convert_lua_value(value)
+        
+        # Add the complex blocks back
+        for param, block in complex_blocks.items():
+            parameters[param] = block
+        
+        return parameters
+
+
+def build_unit_record(unit_id, name, unit_file, complex_params):
+    """Parse one unit file into a record with complex blocks expanded to nested tables"""
+    record = {"unit_id": unit_id, "name": name}
+    try:
+        parameters = parse_unit_file(unit_file, complex_params)
+    except Exception:
+        return record
+    for param, value in parameters.items():
+        if param in complex_params:
+            try:
+                value = parse_lua_table(value)
+            except (IndexError, ValueError):
+                pass  # Keep the raw Lua block if it is not a plain table
+        record[param] = value
+    return record
+
+
+def simulate_battles(health_a, dps_a, count_a, health_b, dps_b, count_b, steps=100):
+    """Run many deterministic fights at once and score them for side A
+    
+    Every argument is an array with one entry per matchup. Each side's units share
+    one health pool and deal damage proportional to how many of them are still
+    alive, so losses reduce firepower (discrete Lanchester square law). Returns
+    1.0 where A wins, 0.0 where B wins and 0.5 for a draw or stalemate.
+    """
+    health_a = np.maximum(np.asarray(health_a, dtype=float), 1.0)
+    health_b = np.maximum(np.asarray(health_b, dtype=float), 1.0)
+    dps_a = np.asarray(dps_a, dtype=float)
+    dps_b = np.asarray(dps_b, dtype=float)
+    pool_a = health_a * count_a
+    pool_b = health_b * count_b
+    
+    # Step each fight in a fraction of its quicker initial kill time
+    with np.errstate(divide="ignore"):
+        horizon = np.minimum(pool_b / (dps_a * count_a), pool_a / (dps_b * count_b))
+    active = np.isfinite(horizon)
+    dt = np.where(active, horizon, 0.0) / steps
+    
+    for _ in range(steps * 10):
+        if not active.any():
+            break
+        alive_a = np.ceil(pool_a / health_a)
+        alive_b = np.ceil(pool_b / health_b)
+        # Both sides fire simultaneously
+        damage_to_b = np.where(active, alive_a * dps_a * dt, 0.0)
+        damage_to_a = np.where(active, alive_b * dps_b * dt, 0.0)
+        pool_a = pool_a - damage_to_a
+        pool_b = pool_b - damage_to_b
+        active &= (pool_a > 0) & (pool_b > 0)
+    
+    return np.where(pool_b <= 0, np.where(pool_a > 0, 1.0, 0.5), np.where(pool_a <= 0, 0.0, 0.5))
+
+
+def simulate_battles_parallel(health_a, dps_a, count_a, health_b, dps_b, count_b, chunk_size=50000):
+    """simulate_battles for large sweeps, split into chunks across a process pool"""
+    arrays = [np.broadcast_to(np.asarray(a, dtype=float), np.shape(health_a)).ravel()
+              for a in (health_a, dps_a, count_a, health_b, dps_b, count_b)]
+    total = arrays[0].size
+    if total <= chunk_size:
+        return simulate_battles(*arrays).reshape(np.shape(health_a))
+    
+    chunks = [[a[start:start + chunk_size] for a in arrays] for start in range(0, total, chunk_size)]
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(simulate_battles, *zip(*chunks)))
+    return np.concatenate(results).reshape(np.shape(health_a))
+
+class RingBufferLogHandler(logging.Handler):
+    """Logging handler that buffers formatted lines for the Tk log widget
+    
+    Keeps the most recent lines in a fixed-size ring buffer, collapses consecutive
+    repeats into a count and drops records beyond rate_limit per second (reporting
+    how many were dropped). Warnings and errors are never dropped. The UI collects
+    new lines in batches with drain() and can rebuild its view from the history.
+    """
+    
+    def __init__(self, capacity=500, rate_limit=20):
+        super().__init__()
+        self.capacity = capacity
+        self.lines = deque(maxlen=capacity)  # Recent history
+        self.pending = deque(maxlen=capacity)  # Not yet shown in the widget
+        self.rate_limit = rate_limit
+        self.window_start = 0.0
+        self.window_count = 0
+        self.suppressed = 0
+        self.last_message = None
+        self.repeats = 0
+    
+    def append(self, line):
+        self.lines.append(line)
+        self.pending.append(line)
+    
+    def flush_repeats(self):
+        if self.repeats:
+            self.append(f"{self.last_message} (repeated {self.repeats} more times)")
+            self.repeats = 0
+    
+    def flush_suppressed(self, now):
+        # Start a new one-second rate window, reporting what the last one dropped
+        if now - self.window_start >= 1.0:
+            if self.suppressed:
+                self.append(f"... {self.suppressed} messages suppressed")
+            self.window_start = now
+            self.window_count = 0
+            self.suppressed = 0
+    
+    def emit(self, record):
+        # Handler.handle() already holds self.lock here
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        
+        if message == self.last_message:
+            self.repeats += 1
+            return
+        self.flush_repeats()
+        
+        self.flush_suppressed(time.monotonic())
+        if record.levelno < logging.WARNING:
+            if self.window_count >= self.rate_limit:
+                self.suppressed += 1
+                return
+            self.window_count += 1
+        self.last_message = message
+        self.append(message)
+    
+    def drain(self, history=False):
+        """Return and forget the lines added since the last drain, or the whole history"""
+        with self.lock:
+            self.flush_repeats()
+            self.flush_suppressed(time.monotonic())
+            lines = list(self.lines if history else self.pending)
+            self.pending.clear()
+        return lines
 
 class UnitModifierApp:
-    def __init__(self, root):
+    # Parameter predicate in the search box: <param><op><value>
+    QUERY_PREDICATE = re.compile(r'^(\w+)(>=|<=|!=|>|<|=)(\S+)$')
+    # Tech tree scope in the search box: from:<builder> or builtby:<unit>
+    QUERY_SCOPE = re.compile(r'^(from|builtby):(\w+)$')
+    # Start of a Lua tweak table: leading comments and whitespace, an optional return, then '{'
+    TWEAK_TABLE_START = re.compile(r'(?:\s+|--\[\[.*?\]\]|--[^\n]*)*(?:return\b(?:\s+|--\[\[.*?\]\]|--[^\n]*)*)?(?={)',
+                                   re.DOTALL)
+    # URL-safe (or standard) Base64 tweak payload, whitespace removed
+    BASE64_PAYLOAD = re.compile(r'[A-Za-z0-9_\-+/]+=*')
+
+    def __init__(self, root, log_file=None):
         self.root = root
         self.root.title("Unit Parameter Modifier")
         self.root.geometry("1200x900")  # Increased width for comparison view
@@ -17,25 +321,87 @@ class UnitModifierApp:
         self.current_unit_params = {}
         self.original_unit_params = {}  # Store original parameters for comparison
         self.current_unit_id = None
-        self.modifications = {}
+        self.modifications = {}  # Top tweak layer: edits saved to Export.txt
+        self.modifications_version = 0  # Bumped whenever self.modifications changes
+        self.tweak_layers = []  # Lower tweak layers, highest priority first (see add_tweak_layer)
+        self.tweak_layer_counter = 0
+        self.layer_file = "Layers.json"  # Layer stack kept across restarts
+        self.profile_dir = "profiles"  # Named tweak presets (see add_tweak_profile)
+        self.lua_chunk_cache = {}  # unit_id -> (layer key, rendered Lua)
+        self.payload_cache = (None, None)  # (Lua payload, Base64 payload)
+        self.modifications_lock = threading.RLock()  # Held while the edits or layers change and while the API reads them
         self.unit_files_path = "units"
-        self.complex_params = ["customparams", "featuredefs", "sfxtypes", "sounds"]
+        self.complex_params = ["customparams", "featuredefs", "sfxtypes", "sounds", "buildoptions",
+                               "weapondefs", "weapons"]
         self.added_parameters = set()  # Track parameters added via import
         self.comparison_mode = False  # Track if we're in comparison view
+        self.unit_file_index = None  # lowercase unit id -> unit file path
+        self.param_hash_index = None  # param -> {value key: set of unit ids}
+        self.param_range_index = {}  # param -> (sorted numeric values, matching unit ids)
+        self.index_epoch = 0  # Bumped when the indexes go stale; older background builds are discarded
+        self.index_build_epoch = None  # Epoch of the queued or running index build, None once it ends
+        self.search_pending = False  # A predicate search is waiting for the index
+        self.display_index = {}  # display_text -> (unit_id, name)
+        
+        # Buildoptions graph in compressed adjacency form (see build_tech_tree)
+        self.tech_tree_nodes = []  # node number -> unit id
+        self.tech_tree_node_index = {}  # unit id -> node number
+        self.tech_tree_offsets = array('i')  # node -> start of its buildoptions in tech_tree_targets
+        self.tech_tree_targets = array('i')
+        self.tech_tree_reverse_offsets = array('i')  # node -> start of its builders in tech_tree_sources
+        self.tech_tree_sources = array('i')
+        self.tech_tree_tiers = array('i')  # build steps from a root builder, -1 if unreachable
+        
+        # Matchup simulator settings
+        self.simulation_budget = 3000  # Metal-equivalent army value for cost-equal fights
+        self.energy_per_metal = 60  # Rough exchange rate used to fold energy into cost
+        self.simulation_max_units = 64  # Largest army tried when searching units needed
+        
+        # LRU cache of parsed unit files, bounded by entry count and estimated size
+        self.unit_cache = OrderedDict()  # unit_id -> (parameters, size in bytes)
+        self.unit_cache_bytes = 0
+        self.unit_cache_max_units = 256
+        self.unit_cache_max_bytes = 32 * 1024 * 1024
+        self.unit_cache_lock = threading.Lock()
+        self.unit_cache_epoch = 0  # Bumped by clear_unit_cache so in-flight parses are not cached
+        
+        # Background worker that parses units near the current selection ahead of time
+        self.prefetch_queue = queue.Queue()
+        self.prefetch_generation = 0
+        self.prefetch_radius = 2  # List entries above and below the selection
+        self.prefetch_top_results = 5  # Leading entries of the current filter
+        threading.Thread(target=self.prefetch_worker, daemon=True).start()
+        self.api_server = None  # Optional local JSON API (see start_api_server)
         
         # Create custom styles for comparison highlighting
         self.style = ttk.Style()
         self.style.configure('New.TFrame', background='#e0f7fa')  # Light blue for new params
         self.style.configure('Modified.TFrame', background='#e8f5e9')  # Light green for modified params
         
+        # Logging: records go to a ring buffer that is flushed to the log widget on a timer
+        self.logger = logging.getLogger("EasyTweak")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.log_handler = RingBufferLogHandler(capacity=500)
+        self.log_handler.setLevel(logging.INFO)
+        self.logger.addHandler(self.log_handler)
+        self.log_flush_interval = 200  # Milliseconds between widget updates
+        self.log_widget_lines = 0  # Log lines currently shown in the widget
+        if log_file:
+            # Attached before anything is loaded so the file gets the startup messages too
+            self.enable_log_file(log_file)
+        
         # Create UI
         self.create_widgets()
+        self.root.after(self.log_flush_interval, self.flush_log)
         
         # Load data
         self.load_translation_data()
         
         # Load existing export data if available
         self.load_export_data()
+        self.load_layer_stack()
+        self.refresh_layer_list()
 
     def create_widgets(self):
         # Main frame
@@ -58,6 +424,21 @@ class UnitModifierApp:
         
         ttk.Button(file_frame, text="Reload Data", command=self.reload_data).grid(row=2, column=0, columnspan=3, pady=10)
         
+        # Tweak layers stacked under the edits in Export.txt
+        layer_frame = ttk.LabelFrame(file_frame, text="Tweak Layers (top wins)", padding=5)
+        layer_frame.grid(row=0, column=3, rowspan=3, sticky="nsew", padx=10)
+        self.layer_list = tk.Listbox(layer_frame, height=4, width=40)
+        self.layer_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        layer_buttons = ttk.Frame(layer_frame)
+        layer_buttons.pack(side=tk.LEFT, padx=5)
+        ttk.Button(layer_buttons, text="Add File", command=self.add_tweak_file).grid(row=0, column=0, sticky="ew")
+        ttk.Button(layer_buttons, text="Add Base64", command=self.add_tweak_base64).grid(row=0, column=1, sticky="ew")
+        ttk.Button(layer_buttons, text="Add Profile", command=self.add_tweak_profile).grid(row=1, column=0, sticky="ew")
+        ttk.Button(layer_buttons, text="Save Profile", command=self.save_tweak_profile).grid(row=1, column=1, sticky="ew")
+        ttk.Button(layer_buttons, text="Move Up", command=lambda: self.move_tweak_layer(-1)).grid(row=2, column=0, sticky="ew")
+        ttk.Button(layer_buttons, text="Move Down", command=lambda: self.move_tweak_layer(1)).grid(row=2, column=1, sticky="ew")
+        ttk.Button(layer_buttons, text="Remove", command=self.remove_tweak_layer).grid(row=3, column=0, columnspan=2, sticky="ew")
+        
         # Create a frame for the right side (log and unit selection)
         right_frame = ttk.Frame(main_frame)
         right_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
@@ -110,6 +491,10 @@ class UnitModifierApp:
         ttk.Button(param_button_frame, text="Import Parameters from Parameters.txt", 
                   command=self.import_parameters).pack(side=tk.LEFT, padx=5)
         
+        # Add simulator button
+        ttk.Button(param_button_frame, text="Preview Balance Impact",
+                  command=self.show_balance_preview).pack(side=tk.LEFT, padx=5)
+        
         # Add Compare button
         self.compare_button = ttk.Button(param_button_frame, text="Revert to original", 
                                        command=self.toggle_comparison)
@@ -142,13 +527,41 @@ class UnitModifierApp:
         ttk.Button(button_frame, text="Clear Modifications", command=self.clear_modifications).pack(side=tk.LEFT, padx=10)
         ttk.Button(button_frame, text="Save Modifications", command=self.export_modifications).pack(side=tk.LEFT, padx=10)
         ttk.Button(button_frame, text="Export to Base64 clipboard", command=self.export_to_base64).pack(side=tk.RIGHT, padx=10)
+        ttk.Button(button_frame, text="Dump All Units", command=self.dump_all_units).pack(side=tk.RIGHT, padx=10)
+        ttk.Button(button_frame, text="Apply to Listed Units", command=self.apply_to_listed_units).pack(side=tk.LEFT, padx=10)
 
-    def log_message(self, message):
-        """Add a message to the log area"""
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)  # Auto-scroll to bottom
-        self.log_text.configure(state=tk.DISABLED)
+    def log_message(self, message, level=None):
+        """Log a message; it reaches the log area on the next flush
+        
+        Without an explicit level, messages like "Error: ..." or "Import Error: ..."
+        are logged as errors and everything else as info. Safe from any thread.
+        """
+        if level is None:
+            level = logging.ERROR if "Error" in message.split(":")[0] else logging.INFO
+        self.logger.log(level, message)
+    
+    def flush_log(self):
+        """Write buffered log lines to the log area in one batch and reschedule"""
+        # Once the widget holds twice the ring buffer, refill it from the buffered history
+        rebuild = self.log_widget_lines >= 2 * self.log_handler.capacity
+        lines = self.log_handler.drain(history=rebuild)
+        if lines:
+            self.log_text.configure(state=tk.NORMAL)
+            if rebuild:
+                self.log_text.delete("1.0", tk.END)
+                self.log_widget_lines = 0
+            self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+            self.log_widget_lines += len(lines)
+            self.log_text.see(tk.END)  # Auto-scroll to bottom
+            self.log_text.configure(state=tk.DISABLED)
+        self.root.after(self.log_flush_interval, self.flush_log)
+    
+    def enable_log_file(self, file_path, level=logging.DEBUG):
+        """Also write every log record to a file"""
+        file_handler = logging.FileHandler(file_path, encoding="utf-8")
+        file_handler.setLevel(level)
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        self.logger.addHandler(file_handler)
     
     def toggle_comparison(self):
         """Toggle comparison view"""
@@ -181,9 +594,12 @@ class UnitModifierApp:
         if directory:
             self.unit_files_path_var.set(directory)
             self.unit_files_path = directory
+            self.invalidate_unit_indexes()
+            self.schedule_index_build()
             self.log_message(f"Unit path set to: {directory}")
 
     def reload_data(self):
+        self.invalidate_unit_indexes()
         self.load_translation_data()
         self.log_message("Data reloaded")
 
@@ -199,6 +615,7 @@ class UnitModifierApp:
             
             # Extract unit names and IDs
             self.unit_data = []
+            self.display_index = {}
             units = self.translation_data.get("units", {}).get("names", {})
             
             for unit_id, name in units.items():
@@ -206,10 +623,14 @@ class UnitModifierApp:
                 display_text = f"{name} ({unit_id})"
                 # Store tuple: (display_text, unit_id, name)
                 self.unit_data.append((display_text, unit_id, name))
+                self.display_index[display_text] = (unit_id, name)
             
             # Sort by name then ID
             self.unit_data.sort(key=lambda x: (x[2].lower(), x[1]))
             
+            # Index the unit files in the background so predicate searches stay instant
+            self.schedule_index_build()
+            
             # Update unit list
             self.filter_units()
             self.log_message(f"Loaded translation data from: {file_path}")
@@ -222,10 +643,47 @@ class UnitModifierApp:
         
         self.unit_list.delete(0, tk.END)
         
-        # Split search term into tokens
-        tokens = search_term.split()
+        # Split search term into name tokens, parameter predicates (e.g. metalcost>500)
+        # and tech tree scopes (e.g. from:armlab)
+        tokens = []
+        predicates = []
+        scopes = []
+        for token in search_term.split():
+            predicate = self.QUERY_PREDICATE.match(token)
+            scope = self.QUERY_SCOPE.match(token)
+            if predicate:
+                predicates.append(predicate.groups())
+            elif scope:
+                scopes.append(scope.groups())
+            else:
+                tokens.append(token)
+        
+        # Predicates and scopes wait for the background index instead of blocking the UI
+        if (predicates or scopes) and self.param_hash_index is None:
+            if not self.index_build_pending():
+                self.log_message("Error: Parameter index unavailable, check the translation file and unit path")
+                return
+            self.log_message("Indexing unit files, search results will follow")
+            if not self.search_pending:
+                self.search_pending = True
+                self.root.after(200, self.refresh_pending_search)
+            return
+        
+        # Resolve predicates and scopes against the parameter indexes and tech tree
+        allowed_ids = None
+        if predicates:
+            allowed_ids = self.query_parameter_index(predicates)
+        for direction, unit_id in scopes:
+            if direction == "from":
+                scoped = self.buildable_from(unit_id)
+            else:
+                scoped = self.builders_of(unit_id)
+            allowed_ids = scoped if allowed_ids is None else allowed_ids & scoped
         
         for display_text, unit_id, name in self.unit_data:
+            if allowed_ids is not None and unit_id not in allowed_ids:
+                continue
+            
             # Create a search string that combines name and ID
             search_string = f"{name.lower()} {unit_id.lower()}"
             
@@ -244,10 +702,260 @@ class UnitModifierApp:
             self.unit_list.see(0)
             self.unit_selected()
         else:
-            self.log_message(f"No units match search: '{search_term}'")
+            self.log_message(f"No units match search: '{search_term}'", logging.DEBUG)
+
+    def refresh_pending_search(self):
+        """Re-run a search that was waiting for the parameter index once it is ready"""
+        if self.param_hash_index is None and self.index_build_pending():
+            self.root.after(200, self.refresh_pending_search)
+            return
+        # Ready, or the build failed or was dropped; filter_units reports the latter
+        self.search_pending = False
+        self.filter_units()
+
+    def index_build_pending(self):
+        """True while an index build for the current epoch is queued or running"""
+        return self.index_build_epoch == self.index_epoch
+
+    def schedule_index_build(self):
+        """Rebuild the parameter index on the background worker"""
+        self.index_epoch += 1
+        self.param_hash_index = None
+        epoch = self.index_build_epoch = self.index_epoch
+        
+        def build():
+            try:
+                self.build_parameter_index()
+            finally:
+                # Ready or failed, either way searches stop waiting for this build
+                if self.index_build_epoch == epoch:
+                    self.index_build_epoch = None
+        
+        self.prefetch_queue.put((None, build))
+
+    def invalidate_unit_indexes(self):
+        """Drop the file and parameter indexes so they are rebuilt from the current unit path"""
+        self.index_epoch += 1
+        self.unit_file_index = None
+        self.param_hash_index = None
+        self.param_range_index = {}
+        self.tech_tree_node_index = {}
+        self.clear_unit_cache()
+
+    def build_unit_file_index(self):
+        """Walk the unit directory once and map unit IDs to their Lua files"""
+        unit_file_index = {}
+        for root, dirs, files in os.walk(self.unit_files_path):
+            for file in files:
+                if file.lower().endswith(".lua"):
+                    unit_id = file[:-4].lower()
+                    unit_file_index.setdefault(unit_id, os.path.join(root, file))
+        # Publish the finished index at once; the prefetch worker reads it too
+        self.unit_file_index = unit_file_index
+
+    def index_value_key(self, value):
+        """Normalize a parameter value into a hash index key"""
+        if isinstance(value, bool):
+            return ("bool", value)
+        if isinstance(value, (int, float)):
+            return ("number", float(value))
+        return ("string", str(value).lower())
+
+    def build_parameter_index(self):
+        """Parse every known unit once and build hash and sorted indexes over flat parameters
+        
+        Runs on the background worker. Everything is built in locals and published at the
+        end, param_hash_index last since it marks the index as ready; a build that was
+        overtaken by a path change or reload is thrown away.
+        """
+        epoch = self.index_epoch
+        if self.unit_file_index is None:
+            self.build_unit_file_index()
+        unit_file_index = self.unit_file_index
+        
+        param_hash_index = {}
+        numeric_values = {}
+        build_edges = {}
+        for display_text, unit_id, name in self.unit_data:
+            unit_file = unit_file_index.get(unit_id.lower())
+            if not unit_file:
+                continue
+            for param, value in self.parse_lua_file(unit_file).items():
+                if param == "buildoptions":
+                    build_edges[unit_id] = self.parse_buildoptions(value)
+                if param in self.complex_params:
+                    continue
+                key = self.index_value_key(value)
+                param_hash_index.setdefault(param.lower(), {}).setdefault(key, set()).add(unit_id)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    numeric_values.setdefault(param.lower(), []).append((value, unit_id))
+        
+        # Tech tree from the same pass; tiers are searchable as buildtier
+        tech_tree = self.build_tech_tree(build_edges)
+        nodes, tiers = tech_tree["nodes"], tech_tree["tiers"]
+        for node, tier in enumerate(tiers):
+            if tier >= 0:
+                unit_id = nodes[node]
+                param_hash_index.setdefault("buildtier", {}).setdefault(self.index_value_key(tier), set()).add(unit_id)
+                numeric_values.setdefault("buildtier", []).append((tier, unit_id))
+        
+        # Sorted value arrays with parallel unit ids for bisect range lookups
+        param_range_index = {}
+        for param, pairs in numeric_values.items():
+            pairs.sort()
+            param_range_index[param] = ([v for v, _ in pairs], [u for _, u in pairs])
+        
+        if epoch != self.index_epoch:
+            return
+        self.tech_tree_nodes = nodes
+        self.tech_tree_node_index = tech_tree["node_index"]
+        self.tech_tree_offsets = tech_tree["offsets"]
+        self.tech_tree_targets = tech_tree["targets"]
+        self.tech_tree_reverse_offsets = tech_tree["reverse_offsets"]
+        self.tech_tree_sources = tech_tree["sources"]
+        self.tech_tree_tiers = tiers
+        self.param_range_index = param_range_index
+        self.param_hash_index = param_hash_index
+        
+        self.log_message(f"Indexed {len(param_hash_index)} parameters across {len(unit_file_index)} unit files")
+
+    def parse_buildoptions(self, block):
+        """Return the unit IDs listed in a buildoptions block"""
+        try:
+            options = self.parse_lua_table(block)
+        except (IndexError, ValueError):
+            return []
+        if isinstance(options, dict):
+            options = list(options.values())
+        return [str(option).lower() for option in options if isinstance(option, str)]
+
+    def build_tech_tree(self, build_edges):
+        """Build forward and reverse adjacency arrays from {builder: [unit ids]}
+        
+        Returns a dict with nodes, node_index, offsets/targets (buildoptions),
+        reverse_offsets/sources (builders) and tiers, matching the tech_tree_* attributes.
+        
+        Tiers are breadth-first build steps from the root builders (units nobody
+        builds, i.e. commanders): a commander is tier 0, what it builds is tier 1.
+        """
+        nodes = [unit_id for _, unit_id, _ in self.unit_data]
+        node_index = {unit_id: i for i, unit_id in enumerate(nodes)}
+        for options in build_edges.values():
+            for unit_id in options:
+                if unit_id not in node_index:
+                    node_index[unit_id] = len(nodes)
+                    nodes.append(unit_id)
+        
+        forward = [[] for _ in nodes]
+        reverse = [[] for _ in nodes]
+        for builder, options in build_edges.items():
+            for unit_id in dict.fromkeys(options):
+                forward[node_index[builder]].append(node_index[unit_id])
+                reverse[node_index[unit_id]].append(node_index[builder])
+        
+        def compress(adjacency):
+            offsets = array('i', [0])
+            targets = array('i')
+            for neighbours in adjacency:
+                targets.extend(neighbours)
+                offsets.append(len(targets))
+            return offsets, targets
+        
+        offsets, targets = compress(forward)
+        reverse_offsets, sources = compress(reverse)
+        
+        roots = [i for i in range(len(nodes)) if forward[i] and not reverse[i]]
+        tiers = array('i', [-1] * len(nodes))
+        for root in roots:
+            tiers[root] = 0
+        frontier = roots
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for target in targets[offsets[node]:offsets[node + 1]]:
+                    if tiers[target] < 0:
+                        tiers[target] = tiers[node] + 1
+                        next_frontier.append(target)
+            frontier = next_frontier
+        
+        return {"nodes": nodes, "node_index": node_index, "offsets": offsets, "targets": targets,
+                "reverse_offsets": reverse_offsets, "sources": sources, "tiers": tiers}
+
+    def tech_tree_reachable(self, unit_id, offsets, targets):
+        """Unit IDs reachable from unit_id along the given adjacency arrays"""
+        start = self.tech_tree_node_index.get(unit_id.lower())
+        if start is None:
+            return set()
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for target in targets[offsets[node]:offsets[node + 1]]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        seen.discard(start)
+        return {self.tech_tree_nodes[node] for node in seen}
+
+    def buildable_from(self, unit_id):
+        """Everything unit_id can build directly or through the units it builds"""
+        return self.tech_tree_reachable(unit_id, self.tech_tree_offsets, self.tech_tree_targets)
+
+    def builders_of(self, unit_id):
+        """Every unit that can eventually lead to building unit_id"""
+        return self.tech_tree_reachable(unit_id, self.tech_tree_reverse_offsets, self.tech_tree_sources)
+
+    def unit_tier(self, unit_id):
+        """Build steps from a root builder, or None if unknown (or the index is still building)"""
+        if self.param_hash_index is None:
+            return None
+        node = self.tech_tree_node_index.get(unit_id.lower())
+        if node is None or self.tech_tree_tiers[node] < 0:
+            return None
+        return self.tech_tree_tiers[node]
+
+    def query_parameter_index(self, predicates):
+        """Return the set of unit IDs matching all (param, op, value) predicates
+        
+        Callers check that the background index is ready (param_hash_index is set).
+        Parameter names match case-insensitively, like the lower-cased index keys.
+        """
+        result = None
+        for param, op, raw_value in predicates:
+            param = param.lower()
+            value = convert_lua_value(raw_value)
+            if op in ('=', '!='):
+                matched = self.param_hash_index.get(param, {}).get(self.index_value_key(value), set())
+                if op == '!=':
+                    matched = set().union(*self.param_hash_index.get(param, {}).values()) - matched
+            else:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    self.log_message(f"Error: Range search needs a number: '{param}{op}{raw_value}'")
+                    return set()
+                values, unit_ids = self.param_range_index.get(param, ([], []))
+                if op == '>':
+                    matched = set(unit_ids[bisect.bisect_right(values, value):])
+                elif op == '>=':
+                    matched = set(unit_ids[bisect.bisect_left(values, value):])
+                elif op == '<':
+                    matched = set(unit_ids[:bisect.bisect_left(values, value)])
+                else:
+                    matched = set(unit_ids[:bisect.bisect_right(values, value)])
+            
+            result = matched if result is None else result & matched
+            if not result:
+                break
+        
+        return result
 
     def find_unit_file(self, unit_id):
         """Search for a unit file recursively in the unit directory"""
+        if self.unit_file_index is None:
+            self.build_unit_file_index()
+        unit_file = self.unit_file_index.get(unit_id.lower())
+        if unit_file:
+            return unit_file
+        
         for root, dirs, files in os.walk(self.unit_files_path):
             for file in files:
                 if file.lower().endswith(".lua") and file.lower().startswith(unit_id.lower()):
@@ -256,83 +964,249 @@ class UnitModifierApp:
 
     def extract_balanced_block(self, content, start_index):
         """Extract a balanced Lua block starting from the given index"""
-        level = 1
-        current_index = start_index + 1
-        while current_index < len(content) and level > 0:
-            if content[current_index] == '{':
-                level += 1
-            elif content[current_index] == '}':
-                level -= 1
-            current_index += 1
-        return content[start_index:current_index].strip()
-
-    def parse_lua_file(self, file_path):
+        return extract_balanced_block(content, start_index)
+
+    def clear_unit_cache(self):
+        """Forget all cached unit parameters"""
+        with self.unit_cache_lock:
+            self.unit_cache.clear()
+            self.unit_cache_bytes = 0
+            self.unit_cache_epoch += 1
+
+    def estimate_params_size(self, parameters):
+        """Rough memory footprint of a parsed parameter dict in bytes"""
+        size = sys.getsizeof(parameters)
+        for param, value in parameters.items():
+            size += sys.getsizeof(param) + sys.getsizeof(value)
+        return size
+
+    def get_unit_params(self, unit_id, log_errors=True):
+        """Return parsed parameters for a unit, served from the LRU cache when possible
+        
+        Returns None if no unit file exists and an empty dict if parsing failed.
+        """
+        cache_key = unit_id.lower()
+        with self.unit_cache_lock:
+            cached = self.unit_cache.get(cache_key)
+            if cached is not None:
+                self.unit_cache.move_to_end(cache_key)
+                return cached[0].copy()
+            epoch = self.unit_cache_epoch
+        
+        unit_file = self.find_unit_file(unit_id)
+        if not unit_file:
+            return None
+        parameters = self.parse_lua_file(unit_file, log_errors=log_errors)
+        if not parameters:
+            return parameters
+        
+        size = self.estimate_params_size(parameters)
+        with self.unit_cache_lock:
+            # The cache was cleared while we parsed, possibly for another unit path
+            if epoch != self.unit_cache_epoch:
+                return parameters.copy()
+            if cache_key not in self.unit_cache:
+                self.unit_cache[cache_key] = (parameters, size)
+                self.unit_cache_bytes += size
+            # Evict least recently used units until both limits hold
+            while self.unit_cache and (len(self.unit_cache) > self.unit_cache_max_units
+                                       or self.unit_cache_bytes > self.unit_cache_max_bytes):
+                _, (_, evicted_size) = self.unit_cache.popitem(last=False)
+                self.unit_cache_bytes -= evicted_size
+        return parameters.copy()
+
+    def schedule_prefetch(self, selected_index):
+        """Queue neighbouring list entries and top filter results for background parsing"""
+        self.prefetch_generation += 1
+        size = self.unit_list.size()
+        
+        indexes = []
+        for offset in range(1, self.prefetch_radius + 1):
+            indexes.extend([selected_index + offset, selected_index - offset])
+        indexes.extend(range(self.prefetch_top_results))
+        
+        for index in indexes:
+            if 0 <= index < size and index != selected_index:
+                unit = self.display_index.get(self.unit_list.get(index))
+                if unit:
+                    self.prefetch_queue.put((self.prefetch_generation,
+                                             lambda unit_id=unit[0]: self.get_unit_params(unit_id, log_errors=False)))
+
+    def prefetch_worker(self):
+        """Run queued background jobs (generation, job) in order
+        
+        Prefetches carry the selection generation they were queued for and are skipped
+        once the selection moved on; jobs with generation None (index builds) always run.
+        """
+        while True:
+            generation, job = self.prefetch_queue.get()
+            if generation is not None and generation != self.prefetch_generation:
+                continue
+            try:
+                job()
+            except Exception as e:
+                # Prefetching is best effort; the foreground path reports real errors
+                if generation is None:
+                    self.log_message(f"Error: Background indexing failed: {str(e)}")
+
+    def parse_lua_file(self, file_path, log_errors=True):
         """Parse a Lua file to extract parameters with proper handling of complex structures"""
-        parameters = {}
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-                # Create a working copy to remove complex blocks
-                working_content = content
-                complex_blocks = {}
-                
-                # First, extract complex parameters
-                for complex_param in self.complex_params:
-                    pattern = rf'{complex_param}\s*=\s*{{'
-                    match = re.search(pattern, working_content, re.DOTALL | re.IGNORECASE)
-                    if match:
-                        start_index = match.end() - 1  # Position of the opening brace
-                        complex_block = self.extract_balanced_block(working_content, start_index)
-                        complex_blocks[complex_param] = complex_block
-                        # Remove the complex block from the working content
-                        working_content = working_content.replace(complex_block, "", 1)
-                
-                # Now extract top-level parameters from the modified content
-                pattern = r'^\s*(\w+)\s*=\s*([^,\n{]+),?$'
-                matches = re.findall(pattern, working_content, re.MULTILINE)
-                
-                for param, value in matches:
-                    # Skip parameters that are part of complex blocks
-                    if param in self.complex_params:
-                        continue
-                        
-                    # Remove trailing comma if present
-                    value = value.strip().rstrip(',')
-                    
-                    # Skip if value contains '{' (likely a complex structure)
-                    if '{' in value:
-                        continue
-                    
-                    # Try to convert to appropriate type
-                    try:
-                        if value.lower() == 'true':
-                            parameters[param] = True
-                        elif value.lower() == 'false':
-                            parameters[param] = False
-                        elif '.' in value:
-                            parameters[param] = float(value)
-                        else:
-                            parameters[param] = int(value)
-                    except ValueError:
-                        # Handle string values (remove quotes)
-                        if value.startswith('"') and value.endswith('"'):
-                            parameters[param] = value[1:-1]
-                        elif value.startswith("'") and value.endswith("'"):
-                            parameters[param] = value[1:-1]
-                        else:
-                            parameters[param] = value
-                
-                # Add the complex blocks back
-                for param, block in complex_blocks.items():
-                    parameters[param] = block
-                
-                return parameters
-                
+            return parse_unit_file(file_path, self.complex_params)
         except Exception as e:
-            self.log_message(f"Error: Failed to parse unit file: {str(e)}")
+            if log_errors:
+                self.log_message(f"Error: Failed to parse unit file: {str(e)}")
             return {}
 
+    def parse_lua_table(self, block):
+        """Parse a Lua table constructor into dicts and lists (sequence tables become lists)"""
+        return parse_lua_table(block)
+
+    def flatten_unit_record(self, record, prefix=""):
+        """Flatten nested tables into dotted column names (customparams.techlevel, buildoptions.1)"""
+        flat = {}
+        items = enumerate(record, 1) if isinstance(record, list) else record.items()
+        for key, value in items:
+            column = f"{prefix}{key}"
+            if isinstance(value, (dict, list)):
+                flat.update(self.flatten_unit_record(value, column + "."))
+            else:
+                flat[column] = value
+        return flat
+
+    def iter_unit_records(self, chunk_size=64):
+        """Yield unit records in list order, parsing each chunk of files on a process pool"""
+        if self.unit_file_index is None:
+            self.build_unit_file_index()
+        unit_file_index = self.unit_file_index
+        with ProcessPoolExecutor() as executor:
+            for start in range(0, len(self.unit_data), chunk_size):
+                # Exact IDs only, like the parameter index and the API, so all three agree
+                chunk = [(unit_id, name, unit_file_index.get(unit_id.lower()))
+                         for _, unit_id, name in self.unit_data[start:start + chunk_size]]
+                chunk = [unit for unit in chunk if unit[2]]
+                if not chunk:
+                    continue
+                unit_ids, names, unit_files = zip(*chunk)
+                yield from executor.map(build_unit_record, unit_ids, names, unit_files,
+                                        [self.complex_params] * len(chunk), chunksize=8)
+
+    def dump_units(self, file_path):
+        """Stream all parsed units to .jsonl, .csv or .parquet (chosen by extension)
+        
+        JSON Lines keep nested tables; CSV and Parquet get flattened columns. Those two
+        need the full column set up front, so records are spilled to a temporary JSON Lines
+        file first and then copied over in bounded batches. Returns the number of units.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet" and pyarrow is None:
+            raise RuntimeError("Parquet output requires the pyarrow package")
+        if extension not in (".jsonl", ".csv", ".parquet"):
+            raise ValueError(f"Unsupported dump format: {extension}")
+        
+        count = 0
+        if extension == ".jsonl":
+            with open(file_path, "w", encoding="utf-8") as f:
+                for record in self.iter_unit_records():
+                    f.write(json.dumps(record) + "\n")
+                    count += 1
+            return count
+        
+        columns = {"unit_id": set(), "name": set()}  # column -> value kinds seen
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as spill:
+            for record in self.iter_unit_records():
+                flat = self.flatten_unit_record(record)
+                for column, value in flat.items():
+                    columns.setdefault(column, set()).add(type(value).__name__)
+                spill.write(json.dumps(flat) + "\n")
+                count += 1
+            spill.seek(0)
+            
+            if extension == ".csv":
+                with open(file_path, "w", encoding="utf-8", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=list(columns))
+                    writer.writeheader()
+                    for line in spill:
+                        writer.writerow(json.loads(line))
+            else:
+                self.write_parquet(file_path, spill, columns)
+        return count
+
+    def write_parquet(self, file_path, spill, columns, batch_size=1024):
+        """Write spilled flat records to Parquet, one row group per batch"""
+        fields = []
+        for column, kinds in columns.items():
+            if kinds == {"bool"}:
+                fields.append(pyarrow.field(column, pyarrow.bool_()))
+            elif kinds == {"int"}:
+                fields.append(pyarrow.field(column, pyarrow.int64()))
+            elif kinds and kinds <= {"int", "float"}:
+                fields.append(pyarrow.field(column, pyarrow.float64()))
+            else:
+                fields.append(pyarrow.field(column, pyarrow.string()))
+        schema = pyarrow.schema(fields)
+        
+        def write_batch(writer, rows):
+            data = {}
+            for field in schema:
+                values = [row.get(field.name) for row in rows]
+                if pyarrow.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                data[field.name] = values
+            writer.write_table(pyarrow.Table.from_pydict(data, schema=schema))
+        
+        with pyarrow.parquet.ParquetWriter(file_path, schema) as writer:
+            rows = []
+            for line in spill:
+                rows.append(json.loads(line))
+                if len(rows) >= batch_size:
+                    write_batch(writer, rows)
+                    rows = []
+            if rows:
+                write_batch(writer, rows)
+
+    def dump_all_units(self):
+        """Ask for a target file and dump the whole parsed unit roster into it"""
+        file_path = filedialog.asksaveasfilename(
+            title="Dump All Units",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("Parquet", "*.parquet")]
+        )
+        if not file_path:
+            return
+        
+        def done(count, error):
+            if error:
+                self.log_message(f"Dump Error: Failed to dump units: {str(error)}")
+                messagebox.showerror("Dump Error", f"Failed to dump units: {str(error)}")
+            else:
+                self.log_message(f"Dumped {count} units to {file_path}")
+                messagebox.showinfo("Dump Complete", f"Dumped {count} units to {file_path}")
+        
+        self.log_message(f"Dumping all units to {file_path}...")
+        self.run_in_background(lambda: self.dump_units(file_path), done)
+
+    def run_in_background(self, work, on_done):
+        """Run work() on a thread and pass (result, error) to on_done on the Tk thread"""
+        outcome = {}
+        
+        def target():
+            try:
+                outcome["result"] = work()
+            except Exception as e:
+                outcome["error"] = e
+        
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        
+        # Tk widgets may only be touched from the Tk thread, so poll for completion
+        def poll():
+            if thread.is_alive():
+                self.root.after(100, poll)
+            else:
+                on_done(outcome.get("result"), outcome.get("error"))
+        self.root.after(100, poll)
+
     def create_parameter_fields(self, parameters):
         # Clear existing widgets
         for widget in self.scrollable_frame.winfo_children():
@@ -397,6 +1271,11 @@ class UnitModifierApp:
                 entry = ttk.Entry(value_frame, textvariable=self.entry_vars[param])
                 entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
             
+            # Show which tweak layer the value comes from
+            source = self.modification_source(self.current_unit_id, param)
+            if source:
+                ttk.Label(frame, text=f"[{source}]", foreground="blue").pack(side=tk.RIGHT, padx=5)
+            
             # Add original value display in comparison mode
             if self.comparison_mode:
                 # Create frame for original value display
@@ -466,11 +1345,9 @@ class UnitModifierApp:
         display_text = self.unit_list.get(selected_index[0])
         
         # Find the unit ID for this display text
-        for item in self.unit_data:
-            if item[0] == display_text:
-                self.current_unit_id = item[1]
-                self.current_unit_name = item[2]
-                break
+        unit = self.display_index.get(display_text)
+        if unit:
+            self.current_unit_id, self.current_unit_name = unit
         else:
             self.current_unit_id = None
         
@@ -479,36 +1356,39 @@ class UnitModifierApp:
             return
         
         # Update selected unit info
-        self.selected_info.set(f"Selected Unit: {self.current_unit_name} (ID: {self.current_unit_id})")
+        tier = self.unit_tier(self.current_unit_id)
+        tier_text = f", build tier {tier}" if tier is not None else ""
+        self.selected_info.set(f"Selected Unit: {self.current_unit_name} (ID: {self.current_unit_id}{tier_text})")
         self.log_message(f"Selected unit: {self.current_unit_name} ({self.current_unit_id})")
         
-        # Find and parse unit file
-        unit_file = self.find_unit_file(self.current_unit_id)
-        if not unit_file:
+        # Warm the cache for the units around this one while the user looks at it
+        self.schedule_prefetch(selected_index[0])
+        
+        # Find and parse unit file (cached)
+        parameters = self.get_unit_params(self.current_unit_id)
+        if parameters is None:
             self.log_message(f"Error: Unit file not found for: {self.current_unit_id}")
             return
             
-        # Parse parameters from the unit file
-        self.original_unit_params = self.parse_lua_file(unit_file)
+        self.original_unit_params = parameters
         if not self.original_unit_params:
-            self.log_message(f"Error: Failed to parse unit file: {unit_file}")
+            self.log_message(f"Error: Failed to parse unit file: {self.find_unit_file(self.current_unit_id)}")
             return
             
         # Start with original parameters
         self.current_unit_params = self.original_unit_params.copy()
         self.create_parameter_fields(self.current_unit_params)
         
-        # Load existing modifications if any
-        if self.current_unit_id in self.modifications:
-            for param, value in self.modifications[self.current_unit_id].items():
-                if param in self.entry_vars:
-                    if isinstance(self.entry_vars[param], tk.Text):
-                        self.entry_vars[param].delete("1.0", tk.END)
-                        self.entry_vars[param].insert("1.0", str(value))
-                    else:
-                        self.entry_vars[param].set(str(value))
-                    # Update current unit params with modified value
-                    self.current_unit_params[param] = value
+        # Load existing modifications from all tweak layers if any
+        for param, value in self.resolved_unit_modifications(self.current_unit_id).items():
+            if param in self.entry_vars:
+                if isinstance(self.entry_vars[param], tk.Text):
+                    self.entry_vars[param].delete("1.0", tk.END)
+                    self.entry_vars[param].insert("1.0", str(value))
+                else:
+                    self.entry_vars[param].set(str(value))
+                # Update current unit params with modified value
+                self.current_unit_params[param] = value
 
     def load_export_data(self):
         """Load existing modifications from Export.txt if available"""
@@ -520,63 +1400,295 @@ class UnitModifierApp:
             with open("Export.txt", "r") as f:
                 content = f.read()
                 
-            # Parse the Lua table format
-            pattern = r'(\d+)\s*=\s*{([^}]*)'
-            matches = re.findall(pattern, content, re.DOTALL)
-            
-            for unit_id, params_str in matches:
-                unit_mods = {}
-                
-                # First, extract complex parameters
-                complex_params = {}
-                for complex_param in self.complex_params:
-                    complex_pattern = rf'{complex_param}\s*=\s*({{.*?}})'
-                    complex_match = re.search(complex_pattern, params_str, re.DOTALL)
-                    if complex_match:
-                        complex_value = complex_match.group(1).strip()
-                        complex_params[complex_param] = complex_value
-                        # Remove complex parameter from params_str
-                        params_str = params_str.replace(complex_value, "", 1)
+            modifications = self.parse_tweak_text(content)
+            with self.modifications_lock:
+                self.modifications = modifications
+                self.modifications_version += 1
                 
-                # Now parse simple parameters
-                param_pattern = r'(\w+)\s*=\s*([^,}]+)'
-                param_matches = re.findall(param_pattern, params_str)
-                
-                for param, value in param_matches:
-                    # Skip complex parameters we already handled
-                    if param in self.complex_params:
-                        continue
-                        
-                    # Convert to appropriate type
-                    try:
-                        if value.lower() == 'true':
-                            unit_mods[param] = True
-                        elif value.lower() == 'false':
-                            unit_mods[param] = False
-                        elif '.' in value:
-                            unit_mods[param] = float(value)
-                        else:
-                            unit_mods[param] = int(value)
-                    except ValueError:
-                        # Handle string values
-                        if value.startswith('"') and value.endswith('"'):
-                            unit_mods[param] = value[1:-1]
-                        elif value.startswith("'") and value.endswith("'"):
-                            unit_mods[param] = value[1:-1]
-                        else:
-                            unit_mods[param] = value
-                
-                # Add complex parameters back in
-                unit_mods.update(complex_params)
-                
-                # Store in modifications dictionary
-                self.modifications[unit_id] = unit_mods
-                
-            self.log_message(f"Loaded {len(matches)} unit modifications from Export.txt")
+            self.log_message(f"Loaded {len(self.modifications)} unit modifications from Export.txt")
             
         except Exception as e:
             self.log_message(f"Import Error: Failed to load export data: {str(e)}")
 
+    def parse_tweak_text(self, content):
+        """Parse a tweak table ({ unitname = { param = value, ... }, ... }) into a modifications dict"""
+        modifications = {}
+        table_start = content.find("{")
+        if table_start < 0:
+            return modifications
+        body = self.extract_balanced_block(content, table_start)[1:-1]
+        
+        # Walk the unit blocks at the top level of the table
+        unit_pattern = re.compile(r'\[?["\']?(\w+)["\']?\]?\s*=\s*{')
+        position = 0
+        while True:
+            match = unit_pattern.search(body, position)
+            if not match:
+                break
+            block = self.extract_balanced_block(body, match.end() - 1)
+            position = match.end() - 1 + len(block)
+            params_str = block[1:-1]
+            unit_mods = {}
+            
+            # First, extract complex parameters
+            for complex_param in self.complex_params:
+                complex_match = re.search(rf'{complex_param}\s*=\s*{{', params_str, re.IGNORECASE)
+                if complex_match:
+                    complex_value = self.extract_balanced_block(params_str, complex_match.end() - 1)
+                    unit_mods[complex_param] = complex_value
+                    # Remove complex parameter from params_str
+                    params_str = params_str.replace(complex_value, "", 1)
+            
+            # Now parse simple parameters
+            for param, value in re.findall(r'(\w+)\s*=\s*([^,\n}]+)', params_str):
+                if param in self.complex_params:
+                    continue
+                unit_mods[param] = convert_lua_value(value.strip())
+            
+            modifications[match.group(1)] = unit_mods
+        return modifications
+
+    def parse_tweak_source(self, content):
+        """Parse a Lua tweak table, decoding it first if it is a Base64 payload"""
+        table_start = self.TWEAK_TABLE_START.match(content)
+        if table_start is None:
+            payload = "".join(content.split())
+            if not self.BASE64_PAYLOAD.fullmatch(payload):
+                raise ValueError("Not a Lua tweak table or a Base64 payload")
+            try:
+                content = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)).decode("utf-8")
+            except ValueError:
+                raise ValueError("Invalid Base64 tweak payload")
+            content = content.replace("\r\n", "\n")
+            table_start = self.TWEAK_TABLE_START.match(content)
+            if table_start is None:
+                raise ValueError("Base64 payload does not contain a Lua tweak table")
+        return self.parse_tweak_text(content[table_start.end():])
+
+    def make_tweak_layer(self, name, source):
+        """Parse a tweak source into a layer; the raw source is kept so the stack can be saved"""
+        modifications = self.parse_tweak_source(source)
+        self.tweak_layer_counter += 1
+        return {"name": name, "source": source, "modifications": modifications,
+                "version": self.tweak_layer_counter}
+
+    def add_tweak_layer(self, name, source):
+        """Stack a tweak source above the existing layers (below the edits in Export.txt)"""
+        layer = self.make_tweak_layer(name, source)
+        with self.modifications_lock:
+            self.tweak_layers.insert(0, layer)
+        self.layers_changed()
+        self.log_message(f"Added tweak layer {name} with {len(layer['modifications'])} units")
+
+    def layers_changed(self, selected_layer=None):
+        """Save the layer stack and refresh everything that shows resolved values"""
+        self.save_layer_stack()
+        self.refresh_layer_list()
+        if selected_layer is not None:
+            self.layer_list.selection_set(selected_layer + 1)
+        if self.current_unit_id:
+            self.unit_selected()
+
+    def save_layer_stack(self):
+        """Write the layer names and sources to Layers.json, highest priority first"""
+        try:
+            with open(self.layer_file, "w", encoding="utf-8") as f:
+                json.dump([{"name": layer["name"], "source": layer["source"]} for layer in self.tweak_layers],
+                          f, indent=2)
+        except Exception as e:
+            self.log_message(f"Error: Failed to save tweak layers: {str(e)}")
+
+    def load_layer_stack(self):
+        """Restore the layer stack saved in Layers.json, skipping layers that no longer parse"""
+        if not os.path.exists(self.layer_file):
+            return
+        try:
+            with open(self.layer_file, "r", encoding="utf-8") as f:
+                saved_layers = json.load(f)
+        except Exception as e:
+            self.log_message(f"Import Error: Failed to load tweak layers: {str(e)}")
+            return
+        
+        for saved in saved_layers:
+            try:
+                layer = self.make_tweak_layer(saved["name"], saved["source"])
+                with self.modifications_lock:
+                    self.tweak_layers.append(layer)
+            except Exception as e:
+                self.log_message(f"Import Error: Skipped tweak layer {saved.get('name')}: {str(e)}")
+        if self.tweak_layers:
+            self.log_message(f"Restored {len(self.tweak_layers)} tweak layers from {self.layer_file}")
+
+    def add_tweak_file(self):
+        """Add a tweak layer from a Lua table or Base64 file"""
+        file_path = filedialog.askopenfilename(
+            title="Select Tweak File",
+            filetypes=[("Text files", "*.txt"), ("Lua files", "*.lua"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                content = f.read()
+            self.add_tweak_layer(os.path.basename(file_path), content)
+        except Exception as e:
+            self.log_message(f"Import Error: Failed to load tweak layer: {str(e)}")
+            messagebox.showerror("Import Error", f"Failed to load tweak layer: {str(e)}")
+
+    def add_tweak_base64(self):
+        """Add a tweak layer from a pasted Base64 payload"""
+        payload = simpledialog.askstring("Add Base64 Layer", "Base64 tweak payload:", parent=self.root)
+        if not payload or not payload.strip():
+            return
+        try:
+            self.add_tweak_layer(f"Base64 #{self.tweak_layer_counter + 1}", payload.strip())
+        except Exception as e:
+            self.log_message(f"Import Error: Failed to decode Base64 layer: {str(e)}")
+            messagebox.showerror("Import Error", f"Failed to decode Base64 layer: {str(e)}")
+
+    def profile_names(self):
+        """Names of the tweak profiles saved in the profiles directory"""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        return sorted(os.path.splitext(file)[0] for file in os.listdir(self.profile_dir)
+                      if file.endswith(".txt"))
+
+    def add_tweak_profile(self):
+        """Add a tweak layer from a named profile in the profiles directory"""
+        profiles = self.profile_names()
+        if not profiles:
+            messagebox.showinfo("No Profiles", f"No profiles found in {self.profile_dir}. Use Save Profile first.")
+            return
+        name = simpledialog.askstring("Add Profile", "Profile name:\n" + ", ".join(profiles), parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        if name not in profiles:
+            messagebox.showerror("Unknown Profile", f"No profile named {name}")
+            return
+        try:
+            with open(os.path.join(self.profile_dir, name + ".txt"), "r", encoding="utf-8") as f:
+                content = f.read()
+            self.add_tweak_layer(f"Profile: {name}", content)
+        except Exception as e:
+            self.log_message(f"Import Error: Failed to load profile {name}: {str(e)}")
+            messagebox.showerror("Import Error", f"Failed to load profile {name}: {str(e)}")
+
+    def save_tweak_profile(self):
+        """Save the merged modifications of all layers as a named profile"""
+        content = self.tweak_payload()
+        if content is None:
+            messagebox.showerror("Error", "No modifications to save as a profile")
+            return
+        name = simpledialog.askstring("Save Profile", "Profile name:", parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        if not re.fullmatch(r'[\w\- ]+', name):
+            messagebox.showerror("Invalid Name", "Profile names may only use letters, digits, spaces, - and _")
+            return
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(os.path.join(self.profile_dir, name + ".txt"), "w", encoding="utf-8") as f:
+                f.write(content)
+            self.log_message(f"Saved profile {name}")
+            messagebox.showinfo("Success", f"Profile {name} saved to {self.profile_dir}")
+        except Exception as e:
+            self.log_message(f"Error: Failed to save profile {name}: {str(e)}")
+            messagebox.showerror("Error", f"Failed to save profile {name}: {str(e)}")
+
+    def remove_tweak_layer(self):
+        """Remove the selected tweak layer (the edits layer stays)"""
+        selected = self.layer_list.curselection()
+        if not selected or selected[0] == 0:
+            return
+        with self.modifications_lock:
+            layer = self.tweak_layers.pop(selected[0] - 1)
+        self.layers_changed()
+        self.log_message(f"Removed tweak layer {layer['name']}")
+
+    def move_tweak_layer(self, offset):
+        """Move the selected tweak layer up (-1) or down (1); the edits layer stays on top"""
+        selected = self.layer_list.curselection()
+        if not selected or selected[0] == 0:
+            return
+        index = selected[0] - 1
+        target = index + offset
+        if not 0 <= target < len(self.tweak_layers):
+            return
+        with self.modifications_lock:
+            self.tweak_layers[index], self.tweak_layers[target] = self.tweak_layers[target], self.tweak_layers[index]
+        self.layers_changed(selected_layer=target)
+        self.log_message(f"Moved tweak layer {self.tweak_layers[target]['name']} to position {target + 1}")
+
+    def refresh_layer_list(self):
+        """Show the layer stack, highest priority first"""
+        self.layer_list.delete(0, tk.END)
+        self.layer_list.insert(tk.END, "Edits (Export.txt)")
+        for layer in self.tweak_layers:
+            self.layer_list.insert(tk.END, layer["name"])
+
+    def resolved_unit_modifications(self, unit_id, include_edits=True):
+        """Overlay of one unit's modifications across all layers, without copying them"""
+        maps = [layer["modifications"][unit_id] for layer in self.tweak_layers
+                if unit_id in layer["modifications"]]
+        if include_edits and unit_id in self.modifications:
+            maps.insert(0, self.modifications[unit_id])
+        return ChainMap(*maps)
+
+    def merged_modifications(self):
+        """All units touched by any layer mapped to their resolved overlays"""
+        unit_ids = dict.fromkeys(self.modifications)
+        for layer in reversed(self.tweak_layers):
+            unit_ids.update(dict.fromkeys(layer["modifications"]))
+        return {unit_id: self.resolved_unit_modifications(unit_id) for unit_id in unit_ids}
+
+    def modification_source(self, unit_id, param):
+        """Name of the layer a unit's parameter value comes from, or None if unmodified"""
+        if param in self.modifications.get(unit_id, {}):
+            return "Edits"
+        for layer in self.tweak_layers:
+            if param in layer["modifications"].get(unit_id, {}):
+                return layer["name"]
+        return None
+
+    def tweak_payload(self):
+        """Lua tweak table for export: Export.txt alone, or all layers merged (cached per unit)
+        
+        Also called from API threads, so the layers are read and the caches written
+        under modifications_lock.
+        """
+        with self.modifications_lock:
+            if not self.tweak_layers:
+                # Without extra layers the saved file is the payload
+                if not os.path.exists("Export.txt"):
+                    return None
+                with open("Export.txt", "r", encoding="utf-8") as f:
+                    return f.read()
+            
+            chunks = []
+            for unit_id, params in self.merged_modifications().items():
+                # A unit only needs re-rendering when one of the layers it appears in changed
+                key = tuple(layer["version"] for layer in self.tweak_layers if unit_id in layer["modifications"])
+                if unit_id in self.modifications:
+                    key += (-self.modifications_version,)
+                cached = self.lua_chunk_cache.get(unit_id)
+                if cached is None or cached[0] != key:
+                    cached = (key, self.render_unit_lua(unit_id, params))
+                    self.lua_chunk_cache[unit_id] = cached
+                chunks.append(cached[1])
+            return self.join_lua_chunks(chunks)
+
+    def tweak_payload_base64(self):
+        """Base64 form of tweak_payload, re-encoded only when the payload changed"""
+        with self.modifications_lock:
+            content = self.tweak_payload()
+            if content is None:
+                return None
+            if self.payload_cache[0] != content:
+                self.payload_cache = (content, self.encode_base64_payload(content))
+            return self.payload_cache[1]
+
     def clear_modifications(self):
         """Clear all modifications and delete Export.txt"""
         # Confirm with user
@@ -585,7 +1697,9 @@ class UnitModifierApp:
             
         try:
             # Clear in-memory data
-            self.modifications = {}
+            with self.modifications_lock:
+                self.modifications = {}
+                self.modifications_version += 1
             self.added_parameters = set()
             
             # Clear current unit fields
@@ -653,15 +1767,14 @@ class UnitModifierApp:
             # Recreate fields to include new parameters
             self.create_parameter_fields(self.current_unit_params)
             
-            # Load existing modifications if any
-            if self.current_unit_id in self.modifications:
-                for param, value in self.modifications[self.current_unit_id].items():
-                    if param in self.entry_vars:
-                        if isinstance(self.entry_vars[param], tk.Text):
-                            self.entry_vars[param].delete("1.0", tk.END)
-                            self.entry_vars[param].insert("1.0", str(value))
-                        else:
-                            self.entry_vars[param].set(str(value))
+            # Load existing modifications from all tweak layers if any
+            for param, value in self.resolved_unit_modifications(self.current_unit_id).items():
+                if param in self.entry_vars:
+                    if isinstance(self.entry_vars[param], tk.Text):
+                        self.entry_vars[param].delete("1.0", tk.END)
+                        self.entry_vars[param].insert("1.0", str(value))
+                    else:
+                        self.entry_vars[param].set(str(value))
             
             self.log_message(f"Added {len(params_to_add)} new parameters")
             messagebox.showinfo("Parameters Added", f"Added {len(params_to_add)} new parameters")
@@ -728,6 +1841,21 @@ class UnitModifierApp:
                     if current_value != str(original_value):
                         unit_mods[param] = current_value
         
+        # Values shown from lower tweak layers are not edits unless changed again
+        lower = self.resolved_unit_modifications(self.current_unit_id, include_edits=False)
+        for param, value in lower.items():
+            widget = self.entry_vars.get(param)
+            if widget is None:
+                continue
+            if isinstance(widget, tk.Text):
+                current_value = widget.get("1.0", tk.END).strip()
+            else:
+                current_value = widget.get().strip()
+            if current_value == str(value):
+                unit_mods.pop(param, None)
+            elif current_value:
+                unit_mods[param] = current_value
+        
         # Check if we have any changes
         if not unit_mods:
             self.log_message("No changes to export")
@@ -735,43 +1863,12 @@ class UnitModifierApp:
             return
         
         # Save to modifications dictionary
-        self.modifications[self.current_unit_id] = unit_mods
+        with self.modifications_lock:
+            self.modifications[self.current_unit_id] = unit_mods
+            self.modifications_version += 1
         
         # Generate Lua output with proper formatting
-        lua_output = "{\n"
-        for i, (unit_id, params) in enumerate(self.modifications.items()):
-            param_lines = []
-            for param, value in params.items():
-                if param in self.complex_params:
-                    # Complex parameters are already formatted Lua blocks
-                    param_lines.append(f"{param} = {value}")
-                elif value in [True, False]:
-                    # Boolean values
-                    value_str = "true" if value else "false"
-                    param_lines.append(f"{param} = {value_str}")
-                elif isinstance(value, (int, float)):
-                    # Numeric values
-                    param_lines.append(f"{param} = {value}")
-                elif value.lower() in ['true', 'false']:
-                    # String representations of booleans
-                    param_lines.append(f"{param} = {value}")
-                elif value.replace('.', '', 1).isdigit() or (value.startswith('-') and value[1:].replace('.', '', 1).isdigit()):
-                    # Numeric strings
-                    param_lines.append(f"{param} = {value}")
-                else:
-                    # String values
-                    if '"' in value:
-                        value_str = f"'{value}'"
-                    else:
-                        value_str = f'"{value}"'
-                    param_lines.append(f"{param} = {value_str}")
-                
-            param_str = ",\n\t\t".join(param_lines)
-            lua_output += f"  {unit_id} = {{\n\t\t{param_str}\n\t}}"
-            if i < len(self.modifications) - 1:
-                lua_output += ","
-            lua_output += "\n"
-        lua_output += "}"
+        lua_output = self.build_lua_output(self.modifications)
         
         # Write to file
         try:
@@ -783,10 +1880,254 @@ class UnitModifierApp:
             self.log_message(f"Error: Failed to export: {str(e)}")
             messagebox.showerror("Error", f"Failed to export: {str(e)}")
 
+    def build_lua_output(self, modifications):
+        """Render a modifications dict as the Lua table written to Export.txt"""
+        return self.join_lua_chunks([self.render_unit_lua(unit_id, params)
+                                     for unit_id, params in modifications.items()])
+
+    def join_lua_chunks(self, chunks):
+        """Wrap rendered unit entries into the outer tweak table"""
+        return "{\n" + ",\n".join(chunks) + ("\n" if chunks else "") + "}"
+
+    def render_unit_lua(self, unit_id, params):
+        """Render one unit's modifications as an entry of the tweak table"""
+        param_lines = []
+        for param, value in params.items():
+            if param in self.complex_params:
+                # Complex parameters are already formatted Lua blocks
+                param_lines.append(f"{param} = {value}")
+            elif isinstance(value, bool):
+                # Boolean values
+                value_str = "true" if value else "false"
+                param_lines.append(f"{param} = {value_str}")
+            elif isinstance(value, (int, float)):
+                # Numeric values
+                param_lines.append(f"{param} = {value}")
+            elif value.lower() in ['true', 'false']:
+                # String representations of booleans
+                param_lines.append(f"{param} = {value}")
+            elif value.replace('.', '', 1).isdigit() or (value.startswith('-') and value[1:].replace('.', '', 1).isdigit()):
+                # Numeric strings
+                param_lines.append(f"{param} = {value}")
+            else:
+                # String values
+                if '"' in value:
+                    value_str = f"'{value}'"
+                else:
+                    value_str = f'"{value}"'
+                param_lines.append(f"{param} = {value_str}")
+            
+        param_str = ",\n\t\t".join(param_lines)
+        return f"  {unit_id} = {{\n\t\t{param_str}\n\t}}"
+
+    def apply_to_listed_units(self):
+        """Set one parameter on every unit in the current search results
+        
+        Combine with a tech tree scope (e.g. from:armlab) to edit a whole subtree.
+        """
+        unit_ids = []
+        for display_text in self.unit_list.get(0, tk.END):
+            unit = self.display_index.get(display_text)
+            if unit:
+                unit_ids.append(unit[0])
+        if not unit_ids:
+            self.log_message("Error: No units listed")
+            messagebox.showerror("Error", "No units listed")
+            return
+        
+        param = simpledialog.askstring("Apply to Listed Units", "Parameter name:", parent=self.root)
+        if not param or not param.strip():
+            return
+        param = param.strip()
+        value = simpledialog.askstring("Apply to Listed Units", f"New value for {param}:", parent=self.root)
+        if value is None or not value.strip():
+            return
+        
+        if not messagebox.askyesno("Confirm Bulk Change", f"Set {param} = {value.strip()} on {len(unit_ids)} units?"):
+            return
+        
+        with self.modifications_lock:
+            for unit_id in unit_ids:
+                self.modifications.setdefault(unit_id, {})[param] = value.strip()
+            self.modifications_version += 1
+        
+        try:
+            with open("Export.txt", "w") as f:
+                f.write(self.build_lua_output(self.modifications))
+            self.log_message(f"Set {param} on {len(unit_ids)} units and saved Export.txt")
+        except Exception as e:
+            self.log_message(f"Error: Failed to export: {str(e)}")
+            messagebox.showerror("Error", f"Failed to export: {str(e)}")
+        
+        # Show the new value if the selected unit was part of the change
+        if self.current_unit_id in unit_ids:
+            self.unit_selected()
+
+    def unit_combat_stats(self, parameters):
+        """Return (health, dps, cost) from unit parameters for the matchup simulator"""
+        def number(value):
+            value = convert_lua_value(str(value))
+            return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else 0.0
+        
+        def table(value):
+            if isinstance(value, (dict, list)):
+                return value
+            try:
+                return self.parse_lua_table(str(value))
+            except (IndexError, ValueError):
+                return {}
+        
+        weapondefs = table(parameters.get("weapondefs", {}))
+        if not isinstance(weapondefs, dict):
+            weapondefs = {}
+        weapondefs = {name.lower(): weapon for name, weapon in weapondefs.items() if isinstance(weapon, dict)}
+        
+        # Every mounted weapon fires; without a weapons table assume each def is mounted once
+        mounts = table(parameters.get("weapons", {}))
+        if isinstance(mounts, dict):
+            mounts = list(mounts.values())
+        mounted = [str(m.get("def", "")).lower() for m in mounts if isinstance(m, dict)] or list(weapondefs)
+        
+        dps = 0.0
+        for name in mounted:
+            weapon = weapondefs.get(name)
+            if not weapon:
+                continue
+            damage = weapon.get("damage", {})
+            damage = number(damage.get("default", 0)) if isinstance(damage, dict) else number(damage)
+            shots = max(number(weapon.get("burst", 1)), 1.0) * max(number(weapon.get("projectiles", 1)), 1.0)
+            reload_time = number(weapon.get("reloadtime", 1)) or 1.0
+            dps += damage * shots / reload_time
+        
+        cost = number(parameters.get("metalcost", 0)) + number(parameters.get("energycost", 0)) / self.energy_per_metal
+        return number(parameters.get("health", 0)), dps, max(cost, 1.0)
+
+    def simulate_balance_impact(self, unit_ids, selected_id=None):
+        """Compare matchups before and after pending modifications
+        
+        Returns one row per combat unit: (unit_id, 1v1 win rate before/after,
+        cost-equal win rate before/after) plus, for selected_id, rows of
+        (opponent, units needed to beat one opponent before/after).
+        Touches no widgets, so it can run off the Tk thread.
+        """
+        units = []
+        for unit_id in unit_ids:
+            parameters = self.get_unit_params(unit_id, log_errors=False)
+            if not parameters:
+                continue
+            before = self.unit_combat_stats(parameters)
+            modified = dict(parameters)
+            modified.update(self.resolved_unit_modifications(unit_id))
+            after = self.unit_combat_stats(modified)
+            if before[1] > 0 or after[1] > 0:
+                units.append((unit_id, before, after))
+        if len(units) < 2:
+            return [], []
+        
+        ids = [unit_id for unit_id, _, _ in units]
+        results = {}
+        for label, index in (("before", 1), ("after", 2)):
+            health, dps, cost = (np.array(column) for column in zip(*[unit[index] for unit in units]))
+            # All pairs at once: rows are side A, columns side B
+            health_a, health_b = np.meshgrid(health, health, indexing="ij")
+            dps_a, dps_b = np.meshgrid(dps, dps, indexing="ij")
+            cost_a, cost_b = np.meshgrid(cost, cost, indexing="ij")
+            off_diagonal = ~np.eye(len(ids), dtype=bool)
+            
+            duel = simulate_battles_parallel(health_a, dps_a, np.ones_like(health_a), health_b, dps_b, np.ones_like(health_b))
+            army_a = np.maximum(np.floor(self.simulation_budget / cost_a), 1.0)
+            army_b = np.maximum(np.floor(self.simulation_budget / cost_b), 1.0)
+            armies = simulate_battles_parallel(health_a, dps_a, army_a, health_b, dps_b, army_b)
+            results[label] = (
+                np.where(off_diagonal, duel, 0).sum(axis=1) / off_diagonal.sum(axis=1),
+                np.where(off_diagonal, armies, 0).sum(axis=1) / off_diagonal.sum(axis=1),
+                health, dps,
+            )
+        
+        win_rates = [(unit_id, results["before"][0][i], results["after"][0][i],
+                      results["before"][1][i], results["after"][1][i]) for i, unit_id in enumerate(ids)]
+        
+        units_needed = []
+        if selected_id in ids:
+            selected = ids.index(selected_id)
+            counts = np.arange(1, self.simulation_max_units + 1, dtype=float)
+            needed = {}
+            for label in ("before", "after"):
+                _, _, health, dps = results[label]
+                # Every opponent against every army size of the selected unit
+                wins = simulate_battles_parallel(
+                    np.full((len(ids), counts.size), health[selected]), np.full((len(ids), counts.size), dps[selected]),
+                    np.broadcast_to(counts, (len(ids), counts.size)),
+                    np.repeat(health[:, None], counts.size, axis=1), np.repeat(dps[:, None], counts.size, axis=1),
+                    np.ones((len(ids), counts.size))) == 1.0
+                needed[label] = [int(counts[row.argmax()]) if row.any() else None for row in wins]
+            units_needed = [(unit_id, needed["before"][i], needed["after"][i])
+                            for i, unit_id in enumerate(ids) if i != selected]
+        
+        return win_rates, units_needed
+
+    def show_balance_preview(self):
+        """Simulate the listed units against each other and show before/after tables"""
+        if np is None:
+            self.log_message("Error: The matchup simulator requires numpy")
+            messagebox.showerror("Error", "The matchup simulator requires numpy (pip install numpy)")
+            return
+        
+        unit_ids = []
+        for display_text in self.unit_list.get(0, tk.END):
+            unit = self.display_index.get(display_text)
+            if unit:
+                unit_ids.append(unit[0])
+        
+        selected_id = self.current_unit_id
+        self.log_message(f"Simulating {len(unit_ids)} listed units...")
+        self.run_in_background(lambda: self.simulate_balance_impact(unit_ids, selected_id),
+                               lambda result, error: self.show_simulation_results(result, error, selected_id))
+
+    def show_simulation_results(self, result, error, selected_id):
+        """Show the before/after tables of a finished simulate_balance_impact run"""
+        if error:
+            self.log_message(f"Simulation Error: {str(error)}")
+            messagebox.showerror("Simulation Error", str(error))
+            return
+        win_rates, units_needed = result
+        if not win_rates:
+            self.log_message("Need at least two listed units with weapons to simulate")
+            messagebox.showinfo("Nothing to Simulate", "Need at least two listed units with weapons")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Balance Impact Preview")
+        
+        def add_table(title, columns, rows):
+            frame = ttk.LabelFrame(window, text=title, padding=10)
+            frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+            tree = ttk.Treeview(frame, columns=columns, show="headings", height=12)
+            for column in columns:
+                tree.heading(column, text=column)
+                tree.column(column, width=140, anchor="e")
+            for row in rows:
+                tree.insert("", tk.END, values=row)
+            scroll = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+            tree.configure(yscrollcommand=scroll.set)
+            tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        add_table("Win rate vs listed units",
+                  ("Unit", "1v1 before", "1v1 after", f"{self.simulation_budget} cost before", f"{self.simulation_budget} cost after"),
+                  [(unit_id, f"{b1:.0%}", f"{a1:.0%}", f"{b2:.0%}", f"{a2:.0%}") for unit_id, b1, a1, b2, a2 in win_rates])
+        if units_needed:
+            add_table(f"{selected_id} needed to beat one",
+                      ("Opponent", "Before", "After"),
+                      [(unit_id, before or f">{self.simulation_max_units}", after or f">{self.simulation_max_units}")
+                       for unit_id, before, after in units_needed])
+        
+        self.log_message(f"Simulated {len(win_rates)} units against each other")
+
     def export_to_base64(self):
         """Export to Base64 with URL-safe encoding and CRLF newlines"""
-        # First, ensure Export.txt exists
-        if not os.path.exists("Export.txt"):
+        # First, ensure Export.txt exists (extra tweak layers can stand in for it)
+        if not os.path.exists("Export.txt") and not self.tweak_layers:
             # Try to export modifications first
             self.export_modifications()
             if not os.path.exists("Export.txt"):
@@ -795,20 +2136,8 @@ class UnitModifierApp:
                 return
         
         try:
-            # Read the content of Export.txt
-            with open("Export.txt", "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            # Convert to CRLF line endings
-            content = content.replace("\n", "\r\n")
-            
-            # Encode to Base64 URL-safe
-            content_bytes = content.encode("utf-8")
-            base64_bytes = base64.urlsafe_b64encode(content_bytes)
-            base64_str = base64_bytes.decode("utf-8")
-            
-            # Remove padding (optional for URL safety)
-            base64_str = base64_str.rstrip('=')
+            # Export.txt merged with any extra tweak layers
+            base64_str = self.tweak_payload_base64()
             
             # Copy to clipboard
             self.root.clipboard_clear()
@@ -822,7 +2151,123 @@ class UnitModifierApp:
             self.log_message(f"Encoding Error: Failed to encode to Base64: {str(e)}")
             messagebox.showerror("Encoding Error", f"Failed to encode to Base64: {str(e)}")
 
+    def encode_base64_payload(self, content):
+        """Encode Export.txt content as the URL-safe Base64 tweak payload"""
+        # Convert to CRLF line endings
+        content = content.replace("\n", "\r\n")
+        
+        # Encode to Base64 URL-safe
+        content_bytes = content.encode("utf-8")
+        base64_bytes = base64.urlsafe_b64encode(content_bytes)
+        base64_str = base64_bytes.decode("utf-8")
+        
+        # Remove padding (optional for URL safety)
+        return base64_str.rstrip('=')
+
+    def start_api_server(self, port, host="127.0.0.1"):
+        """Serve parsed unit data and tweak exports as JSON on a background thread"""
+        handler = type("BoundUnitApiHandler", (UnitApiHandler,), {"app": self})
+        self.api_server = ThreadingHTTPServer((host, port), handler)
+        self.api_server.daemon_threads = True
+        threading.Thread(target=self.api_server.serve_forever, daemon=True).start()
+        self.log_message(f"API server listening on http://{host}:{port}")
+
+    def api_response(self, path):
+        """Resolve an API path to (HTTP status, JSON-serializable payload)"""
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        
+        if parts == ["units"]:
+            return 200, [{"id": unit_id, "name": name} for _, unit_id, name in self.unit_data]
+        
+        if len(parts) == 2 and parts[0] == "units":
+            unit_id = parts[1]
+            # Only exact unit IDs; find_unit_file's prefix fallback would match "arm" too
+            names = self.translation_data.get("units", {}).get("names", {})
+            if self.unit_file_index is None:
+                self.build_unit_file_index()
+            if unit_id not in names and unit_id not in self.unit_file_index:
+                return 404, {"error": f"Unknown unit: {unit_id}"}
+            parameters = self.get_unit_params(unit_id, log_errors=False)
+            if parameters is None:
+                return 404, {"error": f"Unit file not found for: {unit_id}"}
+            name = names.get(unit_id, "")
+            with self.modifications_lock:
+                modifications = dict(self.resolved_unit_modifications(unit_id))
+            return 200, {"id": unit_id, "name": name, "parameters": parameters,
+                         "modifications": modifications}
+        
+        if parts == ["modifications"]:
+            # Copy the overlays under the lock the UI thread holds while editing them
+            with self.modifications_lock:
+                return 200, {unit_id: dict(params) for unit_id, params in self.merged_modifications().items()}
+        
+        if parts == ["export"]:
+            if not os.path.exists("Export.txt"):
+                return 404, {"error": "No Export.txt file"}
+            with open("Export.txt", "r", encoding="utf-8") as f:
+                return 200, {"content": f.read()}
+        
+        if parts == ["export", "base64"]:
+            # Export.txt merged with any extra tweak layers, as the in-game payload
+            payload = self.tweak_payload_base64()
+            if payload is None:
+                return 404, {"error": "No Export.txt file"}
+            return 200, {"payload": payload}
+        
+        return 404, {"error": f"Unknown endpoint: {path}"}
+
+class UnitApiHandler(BaseHTTPRequestHandler):
+    """JSON endpoints backed by a running UnitModifierApp
+    
+    GET /units, /units/<id>, /modifications, /export, /export/base64
+    Responses carry an ETag, honour If-None-Match and are gzipped on request.
+    """
+    app = None
+    
+    def do_GET(self):
+        try:
+            status, payload = self.app.api_response(urlparse(self.path).path)
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        
+        body = json.dumps(payload, sort_keys=True).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        
+        if status == 200 and etag in self.headers.get("If-None-Match", ""):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 512
+        if gzipped:
+            body = gzip.compress(body)
+        
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Keep request logging off stderr and out of the Tk log
+        pass
+
 if __name__ == "__main__":
+    # Process pool workers of a frozen (exe) build must not start the GUI again
+    multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(description="Unit Parameter Modifier")
+    parser.add_argument("--api-port", type=int, help="Also serve unit data as JSON on this local port")
+    parser.add_argument("--log-file", help="Also write the log to this file")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = UnitModifierApp(root)
+    app = UnitModifierApp(root, log_file=args.log_file)
+    if args.api_port:
+        app.start_api_server(args.api_port)
     root.mainloop()
\ No newline at end of file